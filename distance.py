@@ -4,11 +4,16 @@ from __future__ import annotations
 
 import csv
 import os
-from typing import Optional
+from array import array
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
 
 # Index of the hub location in the distance matrix
 HUB_INDEX = 0
 
+# Distances are stored as fixed-point integers in hundredths of a mile
+DISTANCE_SCALE = 100
+
 # Get the directory where this script is located
 SCRIPT_DIR = (
     os.path.dirname(os.path.abspath(__file__)) if "__file__" in dir() else os.getcwd()
@@ -39,10 +44,14 @@ def load_distance_data(
             location_names.append(row[0].strip())
             addresses.append(row[1].strip())
 
-            distances: list[float] = []
-            for value in row[2:]:
-                value = value.strip()
-                distances.append(float(value) if value else 0.0)
+            # float() ignores surrounding whitespace, so a full row converts in
+            # one call; only rows with blank cells need handling per value
+            try:
+                distances = list(map(float, row[2:]))
+            except ValueError:
+                distances = [
+                    float(value) if value.strip() else 0.0 for value in row[2:]
+                ]
             distance_matrix.append(distances)
 
     expected = len(addresses)
@@ -52,47 +61,96 @@ def load_distance_data(
                 f"file row {i} has {len(row)} distances, expected {expected}"
             )
 
+    # Fill in a triangular matrix so lookups work in either direction
+    for i in range(expected):
+        for j in range(i + 1, expected):
+            distance = max(distance_matrix[i][j], distance_matrix[j][i])
+            distance_matrix[i][j] = distance_matrix[j][i] = distance
+
     return location_names, addresses, distance_matrix
 
 
+def quantize_distances(distance_matrix: list[list[float]]) -> list[array]:
+    """
+    Convert a distance matrix in miles to fixed-point rows of DISTANCE_SCALE units.
+    """
+    return [
+        array("H", [round(distance * DISTANCE_SCALE) for distance in row])
+        for row in distance_matrix
+    ]
+
+
 # Load distance data at import
-LOCATION_NAMES, ADDRESSES, DISTANCE_MATRIX = load_distance_data(DISTANCES_FILE)
+LOCATION_NAMES, ADDRESSES, _distances = load_distance_data(DISTANCES_FILE)
+DISTANCE_MATRIX = quantize_distances(_distances)
+
+# For each location, every location ordered from nearest to farthest
+NEIGHBOR_ORDER: list[tuple[int, ...]] = [
+    tuple(sorted(range(len(row)), key=row.__getitem__)) for row in DISTANCE_MATRIX
+]
+
+
+def _clean_address(address: str) -> str:
+    """
+    Normalize an address for comparison: lowercase, no punctuation.
+    """
+    return address.lower().strip().replace(",", "").replace(".", "").replace("  ", " ")
+
+
+def _street_key(cleaned: str) -> Optional[str]:
+    """
+    Get the street number and name from a cleaned address.
+    """
+    parts = cleaned.split()
+    if len(parts) < 2:
+        return None
+    return f"{parts[0]} {parts[1]}"
+
+
+def _build_address_lookup(addresses: list[str]) -> dict[str, int]:
+    """
+    Map every normalized form of each address to its index.
+
+    The first address to claim a key keeps it, matching the order the
+    addresses appear in the distance file.
+    """
+    lookup: dict[str, int] = {}
+    for i, addr in enumerate(addresses):
+        cleaned = _clean_address(addr)
+        lookup.setdefault(addr.lower(), i)
+        lookup.setdefault(cleaned, i)
+        street = _street_key(cleaned)
+        if street:
+            lookup.setdefault(street, i)
+    return lookup
+
 
+# Normalized address forms, built once at import
+_ADDRESS_LOOKUP = _build_address_lookup(ADDRESSES)
+_ADDRESSES_LOWER = [addr.lower() for addr in ADDRESSES]
 
+
+@lru_cache(maxsize=256)
 def get_address_index(address: str) -> int:
     """
     Get the index of an address in the ADDRESSES list.
+
+    Results are cached, since many packages share a destination.
     """
     # Normalize the address for comparison
     normalized = address.lower().strip()
+    cleaned = _clean_address(address)
 
-    for i, addr in enumerate(ADDRESSES):
-        if addr.lower() == normalized:
-            return i
-
-        # Check if the normalized address contains the key parts of the stored address
-        addr_lower = addr.lower()
+    # Exact, cleaned, then street number and name match
+    for key in (normalized, cleaned, _street_key(cleaned)):
+        if key is not None and key in _ADDRESS_LOOKUP:
+            return _ADDRESS_LOOKUP[key]
 
-        # Check for partial match - extract the main address components
+    # Check for partial match - extract the main address components
+    for i, addr_lower in enumerate(_ADDRESSES_LOWER):
         if normalized in addr_lower or addr_lower in normalized:
             return i
 
-        # Additional data cleaning
-        norm_clean = normalized.replace(",", "").replace(".", "").replace("  ", " ")
-        addr_clean = addr_lower.replace(",", "").replace(".", "").replace("  ", " ")
-
-        if norm_clean == addr_clean:
-            return i
-
-        # Check if the street number and name match
-        norm_parts = norm_clean.split()
-        addr_parts = addr_clean.split()
-
-        if len(norm_parts) >= 2 and len(addr_parts) >= 2:
-            # Compare first few parts (number and street name)
-            if norm_parts[0] == addr_parts[0] and norm_parts[1] == addr_parts[1]:
-                return i
-
     # If no match found, return -1
     return -1
 
@@ -100,38 +158,97 @@ def get_address_index(address: str) -> int:
 def get_distance(from_index: int, to_index: int) -> float:
     """
     Get the distance between two locations using their indices.
-    """
-    if from_index < 0 or from_index >= len(DISTANCE_MATRIX):
-        return float("inf")
-    if to_index < 0 or to_index >= len(DISTANCE_MATRIX):
-        return float("inf")
 
-    return DISTANCE_MATRIX[from_index][to_index]
+    Indices come from get_address_index and are validated when packages are
+    received, so only a debug assertion guards against negative indices.
+    """
+    assert from_index >= 0 and to_index >= 0, "location index out of range"
+    return DISTANCE_MATRIX[from_index][to_index] / DISTANCE_SCALE
 
 
-def find_nearest(current_index: int, package_indices: list[int]) -> tuple[
-    Optional[int],
-    Optional[int],
-    float,
-]:
+def find_nearest(
+    current_index: int, pending_stops: dict[int, int]
+) -> tuple[Optional[int], float]:
     """
-    Find the nearest undelivered package from the current location.
+    Find the nearest pending stop from the current location.
 
-    This implements the core of the nearest neighbor algorithm.
+    pending_stops maps each stop's address index to its rank; on equal
+    distances the lower rank wins. This implements the core of the nearest
+    neighbor algorithm.
     """
-    if not package_indices:
-        return None, None, float("inf")
-
-    min_distance = float("inf")
-    nearest_package_id = None
+    # Walk outward from the current location and stop once past the first
+    # pending stop. Comparisons stay in fixed-point units, only the result
+    # is converted.
+    row = DISTANCE_MATRIX[current_index]
     nearest_index = None
+    for address_index in NEIGHBOR_ORDER[current_index]:
+        if nearest_index is not None and row[address_index] > row[nearest_index]:
+            break
+        if address_index in pending_stops and (
+            nearest_index is None
+            or pending_stops[address_index] < pending_stops[nearest_index]
+        ):
+            nearest_index = address_index
 
-    for package_id, address_index in package_indices:
-        distance = get_distance(current_index, address_index)
+    if nearest_index is None:
+        return None, float("inf")
 
-        if distance < min_distance:
-            min_distance = distance
-            nearest_package_id = package_id
-            nearest_index = address_index
+    return nearest_index, row[nearest_index] / DISTANCE_SCALE
+
+
+def plan_route(start_index: int, stops: Iterable[int]) -> list[int]:
+    """
+    Order stops with the nearest neighbor algorithm, starting from start_index.
 
-    return nearest_package_id, nearest_index, min_distance
+    Works on address indices alone. On equal distances the stop listed
+    first in stops wins.
+    """
+    # Each stop ranked by its position; visiting a stop drops its entry
+    pending_stops = {stop: rank for rank, stop in enumerate(stops)}
+    route: list[int] = []
+    current_index = start_index
+    # Every location is in each NEIGHBOR_ORDER row, so each pass visits a
+    # pending stop and the loop runs exactly once per stop
+    for _ in range(len(pending_stops)):
+        nearest_index = find_nearest(current_index, pending_stops)[0]
+        route.append(nearest_index)
+        current_index = nearest_index
+        del pending_stops[nearest_index]
+    return route
+
+
+def improve_route(
+    stops: list[int],
+    start_index: int = HUB_INDEX,
+    end_index: int = HUB_INDEX,
+    accept: Optional[Callable[[list[int]], bool]] = None,
+) -> list[int]:
+    """
+    Shorten a route with 2-opt moves, keeping its start and end fixed.
+
+    A move reverses a run of stops when that makes the route shorter. If
+    accept is given, a move is only kept when accept returns True for the
+    new stop order. Repeats until no move shortens the route.
+    """
+    route = [start_index, *stops, end_index]
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(route) - 2):
+            before = DISTANCE_MATRIX[route[i - 1]]
+            for j in range(i + 1, len(route) - 1):
+                after = route[j + 1]
+                # Distances are symmetric, so only the two changed edges count
+                delta = (
+                    before[route[j]]
+                    + DISTANCE_MATRIX[route[i]][after]
+                    - before[route[i]]
+                    - DISTANCE_MATRIX[route[j]][after]
+                )
+                if delta >= 0:
+                    continue
+                candidate = route[:i] + route[i : j + 1][::-1] + route[j + 1 :]
+                if accept is None or accept(candidate[1:-1]):
+                    route = candidate
+                    improved = True
+    return route[1:-1]
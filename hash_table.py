@@ -9,12 +9,12 @@ from typing import Optional
 class HashTable:
     """
     A custom hash table implementation that stores packages using their ID as the key.
-    Uses chaining with linked lists to handle hash collisions.
+    Uses chaining to handle hash collisions; each bucket maps package IDs to packages.
     """
 
     def __init__(self, capacity: int = 40):
         self.capacity = capacity
-        self.table = [[] for _ in range(capacity)]
+        self.table: list[dict[int, Package]] = [{} for _ in range(capacity)]
         self.size = 0
 
     def _hash(self, key: int):
@@ -25,51 +25,34 @@ class HashTable:
         Insert packages into the hash table.
         """
         # Calculate the bucket index
-        bucket_index = self._hash(package_id)
-        bucket = self.table[bucket_index]
+        bucket = self.table[self._hash(package_id)]
 
-        # Check if package already exists in bucket (update case)
-        for i, (key) in enumerate(bucket):
-            if key == package_id:
-                # Update existing package
-                bucket[i] = (package_id, package)
-                return True
+        # Package doesn't exist yet, count the new entry
+        if package_id not in bucket:
+            self.size += 1
 
-        # Package doesn't exist, add new entry
-        bucket.append((package_id, package))
-        self.size += 1
+        # Add new entry or update existing package
+        bucket[package_id] = package
         return True
 
     def lookup(self, package_id: int) -> Optional[Package]:
         """
         Look up a package by its ID and return the package data.
         """
-        # Calculate the bucket index
-        bucket_index = self._hash(package_id)
-        bucket = self.table[bucket_index]
-
-        # Search for the package in the bucket
-        for key, value in bucket:
-            if key == package_id:
-                return value
-
-        # Package not found
-        return None
+        # Calculate the bucket index and search for the package in the bucket
+        return self.table[self._hash(package_id)].get(package_id)
 
     def remove(self, package_id: int) -> bool:
         """
         Remove a package from the hash table.
         """
-        bucket_index = self._hash(package_id)
-        bucket = self.table[bucket_index]
+        bucket = self.table[self._hash(package_id)]
 
-        for i, (key) in enumerate(bucket):
-            if key == package_id:
-                bucket.pop(i)
-                self.size -= 1
-                return True
+        if bucket.pop(package_id, None) is None:
+            return False
 
-        return False
+        self.size -= 1
+        return True
 
     def get_all(self) -> list[Package]:
         """
@@ -77,8 +60,7 @@ class HashTable:
         """
         packages = []
         for bucket in self.table:
-            for _, value in bucket:
-                packages.append(value)
+            packages.extend(bucket.values())
         return packages
 
     def __len__(self) -> int:
@@ -91,4 +73,4 @@ class HashTable:
         """
         Check if a package ID exists in the hash table.
         """
-        return self.lookup(package_id) is not None
+        return package_id in self.table[self._hash(package_id)]
@@ -4,7 +4,9 @@
 from __future__ import annotations
 
 import csv
+import gzip
 import os
+from bisect import bisect_right
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
@@ -12,7 +14,28 @@ from typing import Optional
 from package import Package, PackageStatus
 
 
-@dataclass(frozen=True)
+# Columns of the persisted log, in file order
+LOG_FIELDS = (
+    "package_id",
+    "event_time",
+    "address",
+    "city",
+    "state",
+    "zip",
+    "notes",
+    "status",
+    "departure_time",
+    "truck_id",
+    "delivery_time",
+    "metadata",
+)
+
+
+# Padded status column for the console status table
+_STATUS_COLUMN = {status: f"{status.value:<10}" for status in PackageStatus}
+
+
+@dataclass(frozen=True, slots=True)
 class LogEntry:
     package_id: int
     event_time: Optional[datetime]
@@ -23,44 +46,82 @@ class LogEntry:
     truck_id: Optional[int]
     delivery_time: Optional[datetime]
     metadata: str
+    # Console formatted times, computed once when the event is recorded
+    event_time_str: str = ""
+    departure_time_str: str = ""
+    delivery_time_str: str = ""
+    # Integer time keys, so status queries compare ints rather than datetimes
+    departure_key: Optional[int] = None
+    delivery_key: Optional[int] = None
+
+
+def format_clock(time_obj: Optional[datetime]) -> str:
+    """
+    Format a datetime as a console friendly clock time, such as "9:05 AM".
+
+    Built from the hour and minute directly, which is cheaper than strftime
+    and does not depend on the platform's "%-I" support.
+    """
+    if time_obj is None:
+        return ""
+    hour = time_obj.hour
+    return f"{hour % 12 or 12}:{time_obj.minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def _time_key(time_obj: Optional[datetime]) -> Optional[int]:
+    """
+    Convert a datetime to an int that orders the same way, in microseconds.
+    """
+    if time_obj is None:
+        return None
+    seconds = (
+        time_obj.toordinal() * 86400
+        + time_obj.hour * 3600
+        + time_obj.minute * 60
+        + time_obj.second
+    )
+    return seconds * 1_000_000 + time_obj.microsecond
 
 
 class Log:
     """
     Log maintains a historical record of package events and persists to CSV.
+
+    Paths ending in .gz are written as gzip-compressed CSV.
     """
 
     def __init__(self, file_path: Optional[str] = None):
         base_dir = os.path.dirname(os.path.abspath(__file__))
         data_dir = os.path.join(base_dir, "data")
-        self.file_path = file_path or os.path.join(data_dir, "package_log.csv")
+        self.file_path = file_path or os.path.join(data_dir, "package_log.csv.gz")
         self.entries: list[LogEntry] = []
+        # Per-package history, kept in event time order, with the event time
+        # keys alongside for bisecting
+        self._by_package: dict[int, list[LogEntry]] = {}
+        self._keys_by_package: dict[int, list[int]] = {}
 
         os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
         self._initialize_csv()
 
+    def __enter__(self) -> Log:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
     def _initialize_csv(self) -> None:
         """
         Initialize a csv file with the appropriate headers.
+
+        The file is kept open so events are buffered rather than reopening
+        the file for every row.
         """
-        with open(self.file_path, "w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(
-                [
-                    "package_id",
-                    "event_time",
-                    "address",
-                    "city",
-                    "state",
-                    "zip",
-                    "notes",
-                    "status",
-                    "departure_time",
-                    "truck_id",
-                    "delivery_time",
-                    "metadata",
-                ]
-            )
+        if self.file_path.endswith(".gz"):
+            self._file = gzip.open(self.file_path, "wt", newline="", compresslevel=1)
+        else:
+            self._file = open(self.file_path, "w", newline="", buffering=1 << 16)
+        self._writer = csv.DictWriter(self._file, fieldnames=LOG_FIELDS)
+        self._writer.writeheader()
 
     def _format_time(self, time_obj: Optional[datetime]) -> str:
         """
@@ -92,34 +153,61 @@ class Log:
             truck_id=truck_id,
             delivery_time=delivery_time,
             metadata=metadata,
+            event_time_str=format_clock(event_time),
+            departure_time_str=format_clock(departure_time),
+            delivery_time_str=format_clock(delivery_time),
+            departure_key=_time_key(departure_time),
+            delivery_key=_time_key(delivery_time),
         )
 
         self.entries.append(entry)
+        # Events without a time sort first
+        event_key = _time_key(event_time)
+        if event_key is None:
+            event_key = -1
+        keys = self._keys_by_package.setdefault(entry.package_id, [])
+        i = bisect_right(keys, event_key)
+        keys.insert(i, event_key)
+        self._by_package.setdefault(entry.package_id, []).insert(i, entry)
+
+        self._writer.writerow(
+            {
+                "package_id": entry.package_id,
+                "event_time": self._format_time(entry.event_time),
+                "address": entry.address[0],
+                "city": entry.address[1],
+                "state": entry.address[2],
+                "zip": entry.address[3],
+                "notes": entry.notes,
+                "status": entry.status.value,
+                "departure_time": self._format_time(entry.departure_time),
+                "truck_id": entry.truck_id if entry.truck_id is not None else "",
+                "delivery_time": self._format_time(entry.delivery_time),
+                "metadata": entry.metadata,
+            }
+        )
+
+    def flush(self) -> None:
+        """
+        Write buffered events to the csv file.
+        """
+        if not self._file.closed:
+            self._file.flush()
 
-        with open(self.file_path, "a", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(
-                [
-                    entry.package_id,
-                    self._format_time(entry.event_time),
-                    entry.address[0],
-                    entry.address[1],
-                    entry.address[2],
-                    entry.address[3],
-                    entry.notes,
-                    entry.status.value,
-                    self._format_time(entry.departure_time),
-                    entry.truck_id if entry.truck_id is not None else "",
-                    self._format_time(entry.delivery_time),
-                    entry.metadata,
-                ]
-            )
+    def close(self) -> None:
+        """
+        Flush and close the csv file.
+        """
+        if not self._file.closed:
+            self._file.close()
 
     def get_history(self, package_id: int) -> list[LogEntry]:
         """
-        Get entire history from log for a single package.
+        Get entire history from log for a single package, in event time order.
+
+        Returns a copy, so callers cannot put the index out of step.
         """
-        return [entry for entry in self.entries if entry.package_id == package_id]
+        return list(self._by_package.get(package_id, ()))
 
     def get_entry_at_time(
         self, package_id: int, query_time: datetime
@@ -127,17 +215,27 @@ class Log:
         """
         Get log entry for a single package at a given time.
         """
-        last_entry = None
-        for entry in self.get_history(package_id):
-            if entry.event_time and entry.event_time <= query_time:
-                last_entry = entry
-        return last_entry
+        return self._entry_at_key(package_id, _time_key(query_time))
+
+    def _entry_at_key(self, package_id: int, query_key: int) -> Optional[LogEntry]:
+        """
+        Get log entry for a single package at a given time key.
+        """
+        keys = self._keys_by_package.get(package_id)
+        if not keys:
+            return None
+        # Events without a time sort first and are never reported
+        i = bisect_right(keys, query_key)
+        if i == 0 or keys[i - 1] < 0:
+            return None
+        return self._by_package[package_id][i - 1]
 
     def format_status_line(self, package: Package, query_time: datetime) -> str:
         """
         Format log entry into console friendly format.
         """
-        entry = self.get_entry_at_time(package.package_id, query_time)
+        query_key = _time_key(query_time)
+        entry = self._entry_at_key(package.package_id, query_key)
         if entry is None:
             status = package.status
             updated = "--"
@@ -148,23 +246,23 @@ class Log:
             status = entry.status
             address = entry.address[0]
             if (
-                entry.status == PackageStatus.DELIVERED
-                and entry.delivery_time
-                and entry.delivery_time <= query_time
+                entry.status is PackageStatus.DELIVERED
+                and entry.delivery_key is not None
+                and entry.delivery_key <= query_key
             ):
-                delivery_time = entry.delivery_time.strftime("%-I:%M %p")
+                delivery_time = entry.delivery_time_str
             else:
                 delivery_time = "-"
             if (
-                entry.status == PackageStatus.ENROUTE
-                and entry.departure_time
-                and entry.departure_time <= query_time
+                entry.status is PackageStatus.ENROUTE
+                and entry.departure_key is not None
+                and entry.departure_key <= query_key
             ):
-                updated = entry.departure_time.strftime("%-I:%M %p")
-            elif entry.event_time and entry.event_time <= query_time:
-                updated = entry.event_time.strftime("%-I:%M %p")
+                updated = entry.departure_time_str
             else:
-                updated = "--"
+                # The entry was found by bisecting on its event time, so the
+                # event time is set and not after the query time
+                updated = entry.event_time_str
             truck_display = str(entry.truck_id) if entry.truck_id else "-"
 
         return (
@@ -172,7 +270,7 @@ class Log:
             f"{address:<40} | "
             f"{package.deadline:<10} | "
             f"{delivery_time:<10} | "
-            f"{status.value:<10} | "
+            f"{_STATUS_COLUMN[status]} | "
             f"{updated:<10} | "
             f"Truck {truck_display}"
         )
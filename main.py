@@ -13,8 +13,9 @@ This program implements a delivery routing solution for WGUPS that:
 3. Uses a nearest neighbor algorithm to optimize delivery routes
 4. Provides an interface to view package status at any time
 
-Algorithm: Nearest Neighbor
-- Time Complexity: O(n^2) where n is the number of packages per truck
+Algorithm: Nearest Neighbor, refined with 2-opt
+- Time Complexity: O(n^2) where n is the number of packages per truck, plus
+  O(n^2) per 2-opt pass over the stops
 - Space Complexity: O(n) for storing package data
 
 The program ensures:
@@ -25,13 +26,23 @@ The program ensures:
 from __future__ import annotations
 
 import csv
+import gc
 import os
+import re
+import sys
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from operator import itemgetter
+from typing import Iterator, Optional
 
 from hash_table import HashTable
-from log import Log
-from package import Package, PackageStatus
+from log import Log, format_clock
+from package import (
+    Package,
+    PackageStatus,
+    iter_package_ids,
+    package_bit,
+)
 from truck import Truck
 
 
@@ -42,6 +53,37 @@ SCRIPT_DIR = (
 )
 DATA_DIR = os.path.join(SCRIPT_DIR, "data")
 PACKAGES_FILE = os.path.join(DATA_DIR, "packages.csv")
+PACKAGE_COLUMNS = (
+    "package_id",
+    "address",
+    "city",
+    "state",
+    "zip",
+    "deadline",
+    "weight",
+    "notes",
+)
+
+# Main menu, written as one block each time it is shown
+MENU_LINES = [
+    "\n" + "=" * 60,
+    "WGUPS DELIVERY SYSTEM",
+    "=" * 60,
+    "1. View the delivery status (including the delivery time) of any package at any time",
+    "2. View total mileage traveled by all trucks",
+    "3. Exit",
+    "-" * 60,
+]
+
+# Time input such as "9:30 AM", "2 pm", "14:30" or "9:30:00". Seconds are
+# accepted but ignored, and a leading "+" or spaces around ":" are allowed,
+# as int() allowed them before.
+_TIME_RE = re.compile(
+    r"^\s*\+?(\d{1,2})\s*"
+    r"(?::\s*\+?(\d{1,2})\s*(?::\s*\+?\d{1,2}\s*)?)?"
+    r"(AM|PM)?\s*$",
+    re.IGNORECASE,
+)
 
 # Delivery time constraints
 START_OF_DAY = datetime(2024, 1, 1, 8, 0, 0)  # 8:00 AM
@@ -60,25 +102,43 @@ def receive_packages(hash_table: HashTable, log: Log) -> bool:
     package ID as the key.
     """
     try:
-        with open(PACKAGES_FILE, "r") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
+        # Read every row in one pass, then build packages by position
+        with open(PACKAGES_FILE, "r", newline="") as file:
+            reader = csv.reader(file)
+            header = [column.strip() for column in next(reader, [])]
+            rows = list(reader)
+
+        missing = [column for column in PACKAGE_COLUMNS if column not in header]
+        if missing:
+            raise ValueError(f"header is missing {', '.join(missing)}")
+        # Pull the columns out of each row in PACKAGE_COLUMNS order
+        get_fields = itemgetter(*(header.index(column) for column in PACKAGE_COLUMNS))
+
+        # Packages and log entries hold no reference cycles, so skip
+        # collector passes while they are created
+        with gc_paused():
+            for row in rows:
+                if not row:
+                    continue
+                package_id, address, city, state, zip_code, deadline, weight, notes = (
+                    get_fields(row)
+                )
                 package = Package(
-                    package_id=row["package_id"],
-                    address=row["address"],
-                    city=row["city"],
-                    state=row["state"],
-                    zip_code=row["zip"],
-                    deadline=row["deadline"],
-                    weight=row["weight"],
-                    notes=row["notes"],
+                    package_id=package_id,
+                    address=address,
+                    city=city,
+                    state=state,
+                    zip_code=zip_code,
+                    deadline=deadline,
+                    weight=weight,
+                    notes=notes,
                     # Assume package is at the warehouse
                     status=PackageStatus.ATHUB,
                 )
                 if package.is_delayed():
                     package.update_status(PackageStatus.DELAYED)
 
-                hash_table.insert(int(row["package_id"]), package)
+                hash_table.insert(package.package_id, package)
                 log.record_event(
                     package=package,
                     event_time=START_OF_DAY,
@@ -94,28 +154,41 @@ def receive_packages(hash_table: HashTable, log: Log) -> bool:
         return False
 
 
-def get_all_linked_packages(setA: set[int], hash_table: HashTable) -> set[int]:
-    linked_packages: set[int] = set()
-    for pkg_id in list(setA):
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """
+    Pause the cyclic garbage collector while bulk creating objects.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def get_all_linked_packages(package_ids: int, hash_table: HashTable) -> int:
+    linked_packages = 0
+    for pkg_id in iter_package_ids(package_ids):
         pkg = hash_table.lookup(pkg_id)
         if not pkg:
             continue
-        for linked_id in pkg.get_linked_packages():
-            if linked_id not in linked_packages:
-                linked_packages.add(linked_id)
+        linked_packages |= pkg.get_linked_mask()
 
     return linked_packages
 
 
 def load_packages(
-    package_ids: set[int], hash_table: HashTable, truck: Truck, log: Log
+    package_ids: int, hash_table: HashTable, truck: Truck, log: Log
 ) -> bool:
-    at_capacity = False
-    for pkg_id in package_ids:
-        package = hash_table.lookup(pkg_id)
-        if package:
-            loaded = truck.load_package(pkg_id)
-            if loaded:
+    with gc_paused():
+        for pkg_id in iter_package_ids(package_ids):
+            package = hash_table.lookup(pkg_id)
+            if package:
+                if not truck.load_package(pkg_id):
+                    # A full truck stays full, so skip the remaining packages
+                    return True
                 package.update_status(PackageStatus.ATHUB)
                 log.record_event(
                     package=package,
@@ -123,10 +196,8 @@ def load_packages(
                     metadata=f"package loaded onto truck {truck.truck_id}",
                     truck_id=truck.truck_id,
                 )
-            else:
-                at_capacity = True
 
-    return at_capacity
+        return False
 
 
 def assign_packages_to_trucks(
@@ -148,7 +219,7 @@ def assign_packages_to_trucks(
 
     Truck 3 (departs when first truck returns):
         - Remaining packages
-        - Package 9 (needs address correction at 10:20 AM)
+        - Package 9 (address corrected here, effective 10:20 AM)
     """
     # Create trucks with their departure times
     truck1 = Truck(1, START_OF_DAY)
@@ -159,50 +230,49 @@ def assign_packages_to_trucks(
     # ==========================================
     # TRUCK 1: Early deadlines and linked packages
     # ==========================================
-    remaining_packages = set([p.package_id for p in hash_table.get_all()])
+    # Package ID sets are bitmasks, see package.package_bit
+    # Sort every package into its starting cohort in a single pass
+    remaining_packages = 0
+    truck1_packages = 0
+    truck2_packages = 0
+    for p in hash_table.get_all():
+        bit = package_bit(p.package_id)
+        remaining_packages |= bit
+        # Read each flag once rather than once per test
+        delayed = p.is_delayed()
+        truck2_only = p.requires_truck_2()
+        if p.has_deadline() and not delayed and not truck2_only:
+            truck1_packages |= bit
+        elif delayed and truck2_only and not p.has_wrong_address():
+            truck2_packages |= bit
 
     # - Early deadline packages (9:00 AM, 10:30 AM deadlines)
     #  - Linked packages that must be delivered together
-    truck1_packages = set(
-        [
-            p.package_id
-            for p in hash_table.get_all()
-            if p.has_deadline() and not p.is_delayed() and not p.requires_truck_2()
-        ]
-    )
     truck1_linked_packages = get_all_linked_packages(truck1_packages, hash_table)
-    truck1_packages = truck1_packages.union(truck1_linked_packages)
+    truck1_packages |= truck1_linked_packages
 
     load_packages(truck1_packages, hash_table, truck1, log)
 
     # ==========================================
     # TRUCK 2: Truck 2 only + Delayed packages
     # ==========================================
-    remaining_packages = remaining_packages.difference(truck1_packages)
+    remaining_packages &= ~truck1_packages
 
     # - Packages that can only be on truck 2
     # - Delayed packages
     # - Fill with other EOD packages
-    truck2_packages = set(
-        [
-            p.package_id
-            for p in hash_table.get_all()
-            if (p.package_id in remaining_packages)
-            and p.is_delayed()
-            and p.requires_truck_2()
-            and not p.has_wrong_address()
-        ]
-    )
+    # Drop candidates that were linked onto truck 1
+    truck2_packages &= remaining_packages
     truck2_linked_packages = get_all_linked_packages(truck2_packages, hash_table)
-    truck2_packages = truck2_packages.union(truck2_linked_packages)
+    truck2_packages |= truck2_linked_packages
 
-    remaining_packages = remaining_packages.difference(truck2_packages)
-    for pkg_id in remaining_packages:
-        if len(truck2_packages) >= truck2.capacity:
+    remaining_packages &= ~truck2_packages
+    for pkg_id in iter_package_ids(remaining_packages):
+        if truck2_packages.bit_count() >= truck2.capacity:
             break
         pkg = hash_table.lookup(pkg_id)
         if not pkg.has_wrong_address():
-            truck2_packages.add(pkg_id)
+            truck2_packages |= package_bit(pkg_id)
 
     load_packages(truck2_packages, hash_table, truck2, log)
 
@@ -211,9 +281,16 @@ def assign_packages_to_trucks(
     # ==========================================
     # - Remaining packages
     # - Package 9 (needs address correction at 10:20 AM)
-    truck3_packages = remaining_packages.difference(truck2_packages)
+    truck3_packages = remaining_packages & ~truck2_packages
     load_packages(truck3_packages, hash_table, truck3, log)
 
+    # Truck 3 never leaves before 10:20 AM, so package 9 can take its
+    # corrected address now; the log still records it at 10:20 AM
+    if truck3_packages & package_bit(9):
+        correct_package_address(
+            hash_table, 9, "410 S State St", "Salt Lake City", "UT", "84111", log
+        )
+
     return truck1, truck2, truck3
 
 
@@ -254,26 +331,34 @@ def run_deliveries(
     Delivery Sequence:
     1. Truck 1 departs at 8:00 AM with early deadline packages
     2. Truck 2 departs at 9:05 AM after delayed packages arrive
-    3. When Truck 1 returns, the driver takes Truck 3
-    4. Package 9 address is corrected at 10:20 AM
+    3. When Truck 1 returns, the driver takes Truck 3, no earlier than
+       10:20 AM when package 9's address is corrected
     """
     # ==========================================
     # Execute Truck 1 deliveries (8:00 AM start)
     # ==========================================
-    print("\nStarting Truck 1 deliveries...")
     truck1_miles = truck1.deliver_packages(hash_table, log)
     truck1_return = truck1.get_return_time()
-    print(f"  Truck 1 returned at {truck1_return.strftime('%-I:%M %p')}")
-    print(f"  Truck 1 mileage: {truck1_miles:.1f} miles")
+    write_lines(
+        [
+            "\nStarting Truck 1 deliveries...",
+            f"  Truck 1 returned at {format_clock(truck1_return)}",
+            f"  Truck 1 mileage: {truck1_miles:.1f} miles",
+        ]
+    )
 
     # ==========================================
     # Execute Truck 2 deliveries (9:05 AM start)
     # ==========================================
-    print("\nStarting Truck 2 deliveries...")
     truck2_miles = truck2.deliver_packages(hash_table, log)
     truck2_return = truck2.get_return_time()
-    print(f"  Truck 2 returned at {truck2_return.strftime('%-I:%M %p')}")
-    print(f"  Truck 2 mileage: {truck2_miles:.1f} miles")
+    write_lines(
+        [
+            "\nStarting Truck 2 deliveries...",
+            f"  Truck 2 returned at {format_clock(truck2_return)}",
+            f"  Truck 2 mileage: {truck2_miles:.1f} miles",
+        ]
+    )
 
     # ==========================================
     # Truck 3: Departs when driver returns
@@ -288,86 +373,83 @@ def run_deliveries(
     truck3.departure_time = truck3_earliest
     truck3.current_time = truck3_earliest
 
-    # Correct package 9 address before Truck 3 departs
-    correct_package_address(
-        hash_table, 9, "410 S State St", "Salt Lake City", "UT", "84111", log
-    )
-
-    print(
-        f"\nStarting Truck 3 deliveries at {truck3_earliest.strftime('%-I:%M %p')}..."
-    )
     truck3_miles = truck3.deliver_packages(hash_table, log)
     truck3_return = truck3.get_return_time()
-    print(f"  Truck 3 returned at {truck3_return.strftime('%-I:%M %p')}")
-    print(f"  Truck 3 mileage: {truck3_miles:.1f} miles")
+    write_lines(
+        [
+            "\nStarting Truck 3 deliveries at "
+            f"{format_clock(truck3_earliest)}...",
+            f"  Truck 3 returned at {format_clock(truck3_return)}",
+            f"  Truck 3 mileage: {truck3_miles:.1f} miles",
+        ]
+    )
 
     # Calculate total mileage
     total_mileage = truck1_miles + truck2_miles + truck3_miles
 
+    # All trucks are back, persist the day's events
+    log.flush()
+
     return total_mileage
 
 
+def write_lines(lines: list[str]) -> None:
+    """
+    Write a block of console lines with a single write call.
+    """
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
 def display_package_status(
     hash_table: HashTable, log: Log, query_time: datetime, package_id: int = -1
 ):
     """
     Display the delivery status (including the delivery time) of any package at any time
     """
-    print("\n" + "=" * 110)
-    print(f"PACKAGE STATUS AT {query_time.strftime('%-I:%M %p')}")
-    print("=" * 110)
-
-    print(
-        f"{'ID':>3} | {'Address':<40} | {'Deadline':<10} | {'Delivered':<10} | {'Status':<10} | {'Updated':<10} | Truck"
-    )
-    print("-" * 110)
+    lines = [
+        "\n" + "=" * 110,
+        f"PACKAGE STATUS AT {format_clock(query_time)}",
+        "=" * 110,
+        f"{'ID':>3} | {'Address':<40} | {'Deadline':<10} | {'Delivered':<10} | {'Status':<10} | {'Updated':<10} | Truck",
+        "-" * 110,
+    ]
     if package_id != -1:
         package = hash_table.lookup(package_id)
         if package:
-            print(log.format_status_line(package, query_time))
+            lines.append(log.format_status_line(package, query_time))
         else:
-            print(f"Package {package_id} not found.")
+            lines.append(f"Package {package_id} not found.")
     else:
-        for i in range(1, 41):
-            package = hash_table.lookup(i)
-            if package:
-                print(log.format_status_line(package, query_time))
+        for package in sorted(hash_table.get_all(), key=lambda p: p.package_id):
+            lines.append(log.format_status_line(package, query_time))
+
+    write_lines(lines)
 
 
 def parse_time_input(time_str: str) -> Optional[datetime]:
     """
     Parse a time string into a datetime object.
     """
-    time_str = time_str.strip().upper()
-
-    try:
-        # Try AM/PM format
-        if "AM" in time_str or "PM" in time_str:
-            time_str = time_str.replace(" ", "")
-            if "AM" in time_str:
-                parts = time_str.replace("AM", "").split(":")
-                hour = int(parts[0])
-                minute = int(parts[1]) if len(parts) > 1 else 0
-                if hour == 12:
-                    hour = 0
-            else:  # PM
-                parts = time_str.replace("PM", "").split(":")
-                hour = int(parts[0])
-                minute = int(parts[1]) if len(parts) > 1 else 0
-                if hour != 12:
-                    hour += 12
-        else:
-            # Try 24-hour format
-            parts = time_str.split(":")
-            hour = int(parts[0])
-            minute = int(parts[1]) if len(parts) > 1 else 0
+    match = _TIME_RE.match(time_str)
+    if not match:
+        return None
 
-            # Assume AM/PM based on reasonable delivery hours
-            if hour < 8:
-                hour += 12
+    hour = int(match[1])
+    minute = int(match[2] or 0)
+    meridiem = (match[3] or "").upper()
+    if meridiem == "AM":
+        if hour == 12:
+            hour = 0
+    elif meridiem == "PM":
+        if hour != 12:
+            hour += 12
+    # Without AM/PM, assume early hours are afternoon delivery times
+    elif hour < 8:
+        hour += 12
 
+    try:
         return datetime(2024, 1, 1, hour, minute, 0)
-    except (ValueError, IndexError):
+    except ValueError:
         return None
 
 
@@ -388,15 +470,7 @@ def main_menu(
     3. Exit
     """
     while True:
-        print("\n" + "=" * 60)
-        print("WGUPS DELIVERY SYSTEM")
-        print("=" * 60)
-        print(
-            "1. View the delivery status (including the delivery time) of any package at any time"
-        )
-        print("2. View total mileage traveled by all trucks")
-        print("3. Exit")
-        print("-" * 60)
+        write_lines(MENU_LINES)
 
         choice = input("Enter choice (1-3): ").strip()
 
@@ -420,20 +494,23 @@ def main_menu(
 
         elif choice == "2":
             # View total mileage
-            print("\n" + "=" * 60)
-            print("TOTAL MILEAGE SUMMARY")
-            print("=" * 60)
-            print(f"Truck 1: {truck1.get_mileage():.1f} miles")
-            print(f"Truck 2: {truck2.get_mileage():.1f} miles")
-            print(f"Truck 3: {truck3.get_mileage():.1f} miles")
-            print("-" * 60)
-            print(f"TOTAL:   {total_mileage:.1f} miles")
-            print("=" * 60)
+            lines = [
+                "\n" + "=" * 60,
+                "TOTAL MILEAGE SUMMARY",
+                "=" * 60,
+                f"Truck 1: {truck1.get_mileage():.1f} miles",
+                f"Truck 2: {truck2.get_mileage():.1f} miles",
+                f"Truck 3: {truck3.get_mileage():.1f} miles",
+                "-" * 60,
+                f"TOTAL:   {total_mileage:.1f} miles",
+                "=" * 60,
+            ]
 
             if total_mileage < 140:
-                print("SUCCESS: Total mileage is under 140 miles!")
+                lines.append("SUCCESS: Total mileage is under 140 miles!")
             else:
-                print("WARNING: Total mileage exceeds 140 miles limit.")
+                lines.append("WARNING: Total mileage exceeds 140 miles limit.")
+            write_lines(lines)
 
         elif choice == "3":
             print("\nThank you for using WGUPS Delivery System. Goodbye!")
@@ -453,51 +530,57 @@ def main():
     3. Executes delivery routes
     4. Launches the user interface
     """
-    print("=" * 60)
-    print("WGUPS PACKAGE ROUTING PROGRAM")
-    print("=" * 60)
+    write_lines(
+        [
+            "=" * 60,
+            "WGUPS PACKAGE ROUTING PROGRAM",
+            "=" * 60,
+            "\nLoading package data...",
+        ]
+    )
 
     # Step 1: Create hash table and load packages
-    print("\nLoading package data...")
     hash_table = HashTable(40)
 
-    log = Log()
-
-    if not receive_packages(hash_table, log):
-        print("Failed to load packages. Exiting.")
-        return
-
-    print(f"  Loaded {len(hash_table)} packages into hash table.")
-
-    # Step 2: Assign packages to trucks
-    print("\nAssigning packages to trucks...")
-    truck1, truck2, truck3 = assign_packages_to_trucks(hash_table, log)
-
-    print(f"  Truck 1: {truck1.get_package_count()} packages (departs 8:00 AM)")
-    print(f"  Truck 2: {truck2.get_package_count()} packages (departs 9:05 AM)")
-    print(
-        f"  Truck 3: {truck3.get_package_count()} packages (departs after Truck 1 returns)"
-    )
+    with Log() as log:
+        if not receive_packages(hash_table, log):
+            print("Failed to load packages. Exiting.")
+            return
+
+        # Step 2: Assign packages to trucks
+        truck1, truck2, truck3 = assign_packages_to_trucks(hash_table, log)
+
+        write_lines(
+            [
+                f"  Loaded {len(hash_table)} packages into hash table.",
+                "\nAssigning packages to trucks...",
+                f"  Truck 1: {truck1.get_package_count()} packages (departs 8:00 AM)",
+                f"  Truck 2: {truck2.get_package_count()} packages (departs 9:05 AM)",
+                f"  Truck 3: {truck3.get_package_count()} packages "
+                "(departs after Truck 1 returns)",
+            ]
+        )
 
-    # Step 3: Execute deliveries
-    print("\n" + "-" * 60)
-    print("EXECUTING DELIVERIES")
-    print("-" * 60)
+        # Step 3: Execute deliveries
+        write_lines(["\n" + "-" * 60, "EXECUTING DELIVERIES", "-" * 60])
 
-    total_mileage = run_deliveries(hash_table, truck1, truck2, truck3, log)
+        total_mileage = run_deliveries(hash_table, truck1, truck2, truck3, log)
 
-    print("\n" + "=" * 60)
-    print("DELIVERY COMPLETE")
-    print("=" * 60)
-    print(f"Total mileage: {total_mileage:.1f} miles")
+        lines = [
+            "\n" + "=" * 60,
+            "DELIVERY COMPLETE",
+            "=" * 60,
+            f"Total mileage: {total_mileage:.1f} miles",
+        ]
 
-    if total_mileage < 140:
-        print("SUCCESS: All packages delivered under 140 miles!")
-    else:
-        print("WARNING: Total mileage exceeds 140 mile limit.")
+        if total_mileage < 140:
+            lines.append("SUCCESS: All packages delivered under 140 miles!")
+        else:
+            lines.append("WARNING: Total mileage exceeds 140 mile limit.")
+        write_lines(lines)
 
-    # Step 4: Launch user interface
-    main_menu(hash_table, log, truck1, truck2, truck3, total_mileage)
+        # Step 4: Launch user interface
+        main_menu(hash_table, log, truck1, truck2, truck3, total_mileage)
 
 
 if __name__ == "__main__":
@@ -3,10 +3,13 @@
 # Stores all package data and tracks delivery status
 from __future__ import annotations
 
+import re
 from enum import Enum
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 from datetime import datetime
 
+from distance import get_address_index
+
 
 class PackageStatus(Enum):
     DELAYED = "delayed"
@@ -15,6 +18,56 @@ class PackageStatus(Enum):
     DELIVERED = "delivered"
 
 
+def package_bit(package_id: int) -> int:
+    """
+    Get the bit representing a package ID in a package mask.
+
+    Sets of package IDs are stored as int bitmasks where bit k is package k + 1.
+    """
+    return 1 << (package_id - 1)
+
+
+def package_mask(package_ids: Iterable[int]) -> int:
+    """
+    Build a package mask from package IDs.
+    """
+    mask = 0
+    for package_id in package_ids:
+        mask |= package_bit(package_id)
+    return mask
+
+
+def iter_package_ids(mask: int) -> Iterator[int]:
+    """
+    Iterate the package IDs in a package mask in ascending order.
+    """
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length()
+        mask ^= lowest
+
+
+# Clock times such as "10:30 AM", "10:30am" or "9:00 pm"
+_CLOCK_TIME_RE = re.compile(r"^(\d{1,2}):(\d{2})\s*([AP]M)$", re.IGNORECASE)
+
+
+def _parse_clock_time(text: str) -> Optional[tuple[int, int]]:
+    """
+    Parse a 12-hour clock time into (hour, minute), or None if it is invalid.
+    """
+    match = _CLOCK_TIME_RE.match(text)
+    if not match:
+        return None
+    hour, minute = int(match[1]), int(match[2])
+    if not 1 <= hour <= 12 or minute > 59:
+        return None
+    if match[3].upper() == "PM":
+        hour = hour % 12 + 12
+    else:
+        hour %= 12
+    return hour, minute
+
+
 class Package:
     """
     Represents a package in the WGUPS delivery system.
@@ -26,6 +79,27 @@ class Package:
         - Delivery tracking (status, time, assigned truck)
     """
 
+    __slots__ = (
+        "package_id",
+        "_address",
+        "city",
+        "state",
+        "zip_code",
+        "address_index",
+        "_deadline",
+        "_has_deadline",
+        "_deadline_time",
+        "weight",
+        "_notes",
+        "_delayed",
+        "_truck2",
+        "_wrong_addr",
+        "_linked",
+        "_linked_mask",
+        "status",
+        "delivery_time",
+    )
+
     def __init__(
         self,
         package_id: int,
@@ -43,63 +117,158 @@ class Package:
         """
         # Inserted data
         self.package_id = int(package_id)
+        # Also resolves address_index
         self.address = address
         self.city = city
         self.state = state
         self.zip_code = zip_code
+        # Also parses the deadline clock time
         self.deadline = deadline
         self.weight = int(weight)
-        self.notes = notes if notes else ""
+        # Also sets the special handling flags parsed from the notes
+        self.notes = notes
         self.status: PackageStatus = status
         # delivery time
         self.delivery_time: Optional[datetime] = None
 
+    @property
+    def address(self) -> str:
+        """
+        Street address of the delivery location.
+        """
+        return self._address
+
+    @address.setter
+    def address(self, address: str) -> None:
+        """
+        Set the address and resolve its index in the distance matrix once,
+        so routing never matches strings. Every path that sets an address
+        goes through here, so an unknown address is always rejected.
+        """
+        address_index = get_address_index(address)
+        if address_index < 0:
+            raise ValueError(
+                f"package {self.package_id} has an unknown address {address!r}"
+            )
+        self._address = address
+        self.address_index: int = address_index
+
+    @property
+    def deadline(self) -> str:
+        """
+        Delivery deadline, such as "10:30 AM", or "EOD".
+        """
+        return self._deadline
+
+    @deadline.setter
+    def deadline(self, deadline: str) -> None:
+        """
+        Set the deadline and parse its clock time once, rather than while
+        routing.
+
+        Anything but EOD (in any case) counts as a deadline. Its clock time
+        is parsed leniently and left as None when it cannot be read, so
+        unusual deadline text never stops packages from loading.
+        """
+        self._deadline = deadline
+        cleaned = deadline.strip()
+        self._has_deadline = cleaned.upper() != "EOD"
+        # (hour, minute) of the deadline, or None
+        self._deadline_time: Optional[tuple[int, int]] = (
+            _parse_clock_time(cleaned) if self._has_deadline else None
+        )
+
+    @property
+    def notes(self) -> str:
+        """
+        Special handling notes for the package.
+        """
+        return self._notes
+
+    @notes.setter
+    def notes(self, notes: Optional[str]) -> None:
+        """
+        Set the notes and rescan them for special handling flags once,
+        rather than on every predicate call.
+        """
+        self._notes = notes if notes else ""
+        lowered = self._notes.lower()
+        self._delayed = "Delayed" in self._notes or "will not arrive" in lowered
+        self._truck2 = "truck 2" in lowered
+        self._wrong_addr = "wrong address" in lowered
+        self._linked = self._parse_linked_packages(self._notes)
+        self._linked_mask = package_mask(self._linked)
+
     def update_status(self, status: PackageStatus, time: Optional[datetime] = None):
         """
         Update the delivery status of the package.
         """
         self.status = status
-        if status == PackageStatus.DELIVERED and time:
+        if status is PackageStatus.DELIVERED and time:
             self.delivery_time = time
 
     def has_deadline(self) -> bool:
         """
         Check if the package has a specific deadline (not EOD).
         """
-        return self.deadline != "EOD"
+        return self._has_deadline
+
+    def get_deadline_time(self, day: datetime) -> Optional[datetime]:
+        """
+        Get the deadline as a datetime on the given day.
+
+        None for EOD, or for a deadline whose time could not be read.
+        """
+        if self._deadline_time is None:
+            return None
+        hour, minute = self._deadline_time
+        return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
 
     def is_delayed(self) -> bool:
         """
         Check if the package is delayed (arrives to depot late).
         """
-        return "Delayed" in self.notes or "will not arrive" in self.notes.lower()
+        return self._delayed
 
     def requires_truck_2(self) -> bool:
         """
         Check if the package must be on truck 2.
         """
-        return "truck 2" in self.notes.lower()
+        return self._truck2
 
     def has_wrong_address(self) -> bool:
         """
         Check if the package has a wrong address that needs correction.
         """
-        return "wrong address" in self.notes.lower()
+        return self._wrong_addr
 
-    def get_linked_packages(self) -> list[int]:
+    def get_linked_mask(self) -> int:
+        """
+        Get the package mask of packages that must be delivered with this package.
         """
-        Get list of package IDs that must be delivered with this package.
+        return self._linked_mask
+
+    def get_linked_packages(self) -> tuple[int, ...]:
+        """
+        Get the IDs of packages that must be delivered with this package.
+        """
+        return self._linked
+
+    @staticmethod
+    def _parse_linked_packages(notes: str) -> tuple[int, ...]:
+        """
+        Parse linked package IDs from notes.
         Example format: "Must be delivered with 13, 15"
+
+        IDs below 1 are not valid packages and are dropped.
         """
-        if "Must be delivered with" not in self.notes:
-            return []
+        if "Must be delivered with" not in notes:
+            return ()
 
         # Parse the package IDs from the notes
         try:
-            parts = self.notes.split("Must be delivered with")[1].strip()
-            # Split by space and convert to integers
-            linked_ids = [int(x) for x in parts.split(",")]
-
-            return linked_ids
+            parts = notes.split("Must be delivered with")[1].strip()
+            linked = (int(x) for x in parts.split(","))
+            return tuple(package_id for package_id in linked if package_id >= 1)
         except (ValueError, IndexError):
-            return []
+            return ()
@@ -3,10 +3,19 @@
 # Handles package loading, delivery routing, and mileage tracking
 from __future__ import annotations
 
+from array import array
 from datetime import datetime, timedelta
-from distance import get_distance, get_address_index, find_nearest, HUB_INDEX
+from typing import Iterator, Optional
+
+from distance import (
+    DISTANCE_MATRIX,
+    DISTANCE_SCALE,
+    HUB_INDEX,
+    improve_route,
+    plan_route,
+)
 from hash_table import HashTable
-from package import PackageStatus
+from package import Package, PackageStatus
 from log import Log
 
 
@@ -15,9 +24,27 @@ class Truck:
     Represents a delivery truck in the WGUPS system.
 
     Each truck can carry up to 16 packages and travels at 18 mph.
-    The truck uses a nearest neighbor algorithm to determine delivery order.
+    The truck orders deliveries with a nearest neighbor algorithm, then
+    shortens the route with 2-opt moves that keep every deadline.
     """
 
+    __slots__ = (
+        "truck_id",
+        "departure_time",
+        "current_time",
+        "current_location",
+        "packages",
+        "delivered_packages",
+        "mileage",
+        "speed_mph",
+        "_sec_per_mile",
+        "capacity",
+        "_history_locations",
+        "_history_seconds",
+        "_history_miles",
+        "_plan_cache",
+    )
+
     def __init__(self, truck_id: int, departure_time: datetime):
         """
         Initialize a new truck.
@@ -27,15 +54,23 @@ class Truck:
         self.current_time: datetime = departure_time
         self.current_location = HUB_INDEX
 
-        self.packages: list[int] = []  # List of package IDs loaded on the truck
-        self.delivered_packages: list[int] = []  # List of delivered package IDs
+        # Package IDs as unsigned shorts rather than boxed ints
+        self.packages = array("H")  # IDs of packages loaded on the truck
+        self.delivered_packages = array("H")  # IDs of delivered packages
         self.mileage: float = 0.0
         self.speed_mph = 18
+        # Travel time per mile, so legs multiply rather than divide
+        self._sec_per_mile = 3600 / self.speed_mph
         self.capacity = 16
 
-        self.route_history: list[tuple[int, datetime, float]] = [
-            (HUB_INDEX, departure_time, 0.0)
-        ]  # (location, time, cumulative_miles)
+        # Route history as parallel arrays of location, seconds after departure
+        # and cumulative miles, starting at the hub; see route_history()
+        self._history_locations = array("H", [HUB_INDEX])
+        self._history_seconds = array("d", [0.0])
+        self._history_miles = array("d", [0.0])
+
+        # Last plan() result and the inputs it was computed from
+        self._plan_cache: Optional[tuple[tuple, list[tuple[int, float]]]] = None
 
     def load_package(self, package_id: int) -> bool:
         """
@@ -57,94 +92,205 @@ class Truck:
         """
         Calculate the time to travel a given distance.
         """
-        hours = distance / self.speed_mph
-        minutes = hours * 60
-        return timedelta(minutes=minutes)
+        return timedelta(seconds=distance * self._sec_per_mile)
 
-    def deliver_packages(self, hash_table: HashTable, log: Log) -> float:
+    def _stop_deadlines(
+        self, stop_packages: dict[int, list[Package]]
+    ) -> Optional[dict[int, float]]:
         """
-        Deliver all packages using the nearest neighbor algorithm.
+        Get the earliest package deadline at each stop that has one.
 
-        This method implements the core delivery algorithm:
-        1. Find the nearest undelivered package
-        2. Travel to that location
-        3. Deliver all packages at that location
-        4. Repeat until all packages are delivered
-        5. Return to the hub
-        """
-        # Build list of packages with their address indices
-        remaining_packages = []
+        Each deadline is converted once into the farthest distance, in
+        DISTANCE_SCALE units, the truck can drive from its current time and
+        still arrive on time, so route checks compare summed distances only.
+        Returns None if any deadline's time could not be read, since routes
+        cannot then be checked against it.
+        """
+        units_per_second = DISTANCE_SCALE / self._sec_per_mile
+        deadlines: dict[int, float] = {}
+        for stop, packages in stop_packages.items():
+            for package in packages:
+                deadline = package.get_deadline_time(self.departure_time)
+                if deadline is None:
+                    if package.has_deadline():
+                        return None
+                    continue
+                seconds = (deadline - self.current_time).total_seconds()
+                reach = seconds * units_per_second
+                if stop not in deadlines or reach < deadlines[stop]:
+                    deadlines[stop] = reach
+        return deadlines
+
+    def _meets_deadlines(self, stops: list[int], deadlines: dict[int, float]) -> bool:
+        """
+        Check that driving the stops in order meets every stop deadline.
+        """
+        current_index = self.current_location
+        total: int = 0
+        for stop in stops:
+            total += DISTANCE_MATRIX[current_index][stop]
+            current_index = stop
+            if stop in deadlines and total > deadlines[stop]:
+                return False
+        return True
+
+    def _resolve_packages(self, hash_table: HashTable) -> list[Package]:
+        """
+        Look up each loaded package once, in load order.
+        """
+        packages: list[Package] = []
         for package_id in self.packages:
             package = hash_table.lookup(package_id)
             if package:
-                package.update_status(PackageStatus.ENROUTE)
-                log.record_event(
-                    package=package,
-                    event_time=self.departure_time,
-                    truck_id=self.truck_id,
-                    departure_time=self.departure_time,
-                    metadata=f"truck {self.truck_id} departed",
-                )
+                packages.append(package)
+        return packages
+
+    def _group_by_stop(self, packages: list[Package]) -> dict[int, list[Package]]:
+        """
+        Group packages by address index, keeping load order.
+        """
+        stop_packages: dict[int, list[Package]] = {}
+        for package in packages:
+            stop_packages.setdefault(package.address_index, []).append(package)
+        return stop_packages
 
-                # Get address index
-                address_index = get_address_index(package.address)
-                remaining_packages.append((package_id, address_index))
+    def plan(self, hash_table: HashTable) -> list[tuple[int, float]]:
+        """
+        Plan the route from the current location without changing any state.
+
+        Returns (location, cumulative_miles) for each stop in delivery order,
+        ending with the return to the hub. The stops are ordered with nearest
+        neighbor, then shortened with 2-opt while every deadline is still met.
+        2-opt is skipped if a package's deadline time cannot be read.
+        The result is cached until the packages, their addresses or deadlines,
+        or the truck's start change.
+        """
+        packages = self._resolve_packages(hash_table)
+        key = (
+            self.current_location,
+            self.current_time,
+            tuple((p.package_id, p.address_index, p.deadline) for p in packages),
+        )
+        if self._plan_cache is not None and self._plan_cache[0] == key:
+            return self._plan_cache[1]
 
-        # Deliver packages using nearest neighbor algorithm
-        while remaining_packages:
-            # Find the nearest package
-            nearest_id, nearest_index, distance = find_nearest(
-                self.current_location, remaining_packages
+        stop_packages = self._group_by_stop(packages)
+        stops = plan_route(self.current_location, stop_packages)
+        deadlines = self._stop_deadlines(stop_packages)
+        # Without readable deadlines, keep the nearest neighbor order
+        if deadlines is not None and self._meets_deadlines(stops, deadlines):
+            stops = improve_route(
+                stops,
+                start_index=self.current_location,
+                accept=lambda route: self._meets_deadlines(route, deadlines),
             )
 
-            if nearest_id is None:
-                break
+        # Sum the legs, including the return to the hub, straight from the
+        # fixed-point matrix rows and convert each total once
+        route: list[tuple[int, float]] = []
+        current_index = self.current_location
+        total: int = 0
+        for stop in [*stops, HUB_INDEX]:
+            total += DISTANCE_MATRIX[current_index][stop]
+            route.append((stop, total / DISTANCE_SCALE))
+            current_index = stop
 
-            # Travel to the delivery location
-            travel_time = self._calculate_travel_time(distance)
-            self.current_time += travel_time
-            self.mileage += distance
-            self.current_location = nearest_index
+        self._plan_cache = (key, route)
+        return route
+
+    def execute(
+        self, route: list[tuple[int, float]], hash_table: HashTable, log: Log
+    ) -> float:
+        """
+        Drive a planned route, delivering packages and advancing the clock.
+
+        The route comes from plan() and ends at the hub. Returns the total
+        mileage.
+        """
+        packages = self._resolve_packages(hash_table)
+        for package in packages:
+            package.update_status(PackageStatus.ENROUTE)
+            log.record_event(
+                package=package,
+                event_time=self.departure_time,
+                truck_id=self.truck_id,
+                departure_time=self.departure_time,
+                metadata=f"truck {self.truck_id} departed",
+            )
+        stop_packages = self._group_by_stop(packages)
+
+        # Track the clock as elapsed seconds and build the datetime once per
+        # stop, rather than adding a timedelta per leg. The loop works on
+        # locals and writes the truck's position back once at the end.
+        start_time = self.current_time
+        start_seconds = (start_time - self.departure_time).total_seconds()
+        start_mileage = self.mileage
+        seconds_per_mile = self._sec_per_mile
+        truck_id = self.truck_id
+        delivered_metadata = f"package delivered by truck {truck_id}"
+        record_event = log.record_event
+        add_delivered = self.delivered_packages.append
+        add_location = self._history_locations.append
+        add_seconds = self._history_seconds.append
+        add_miles = self._history_miles.append
+
+        now: datetime = start_time
+        mileage: float = start_mileage
+        location: int = self.current_location
+        for stop, miles in route:
+            # Travel to the next location
+            elapsed = miles * seconds_per_mile
+            now = start_time + timedelta(seconds=elapsed)
+            mileage = start_mileage + miles
+            location = stop
 
             # Deliver all packages at this location
             # (Multiple packages might share the same address)
-            packages_at_location = [
-                (pid, idx) for pid, idx in remaining_packages if idx == nearest_index
-            ]
-
-            for package_id, _ in packages_at_location:
-                package = hash_table.lookup(package_id)
-                if package:
-                    package.update_status(PackageStatus.DELIVERED, self.current_time)
-                    log.record_event(
-                        package=package,
-                        event_time=self.current_time,
-                        truck_id=self.truck_id,
-                        delivery_time=self.current_time,
-                        metadata=f"package delivered by truck {self.truck_id}",
-                    )
-                    self.delivered_packages.append(package_id)
-
-                # Remove from remaining list
-                remaining_packages = [
-                    (pid, idx) for pid, idx in remaining_packages if pid != package_id
-                ]
-
-            # Record route history
-            self.route_history.append((nearest_index, self.current_time, self.mileage))
-
-        # Return to hub
-        return_distance = get_distance(self.current_location, HUB_INDEX)
-        return_time = self._calculate_travel_time(return_distance)
-        self.current_time += return_time
-        self.mileage += return_distance
-        self.current_location = HUB_INDEX
+            for package in stop_packages.pop(stop, ()):
+                package.update_status(PackageStatus.DELIVERED, now)
+                record_event(
+                    package=package,
+                    event_time=now,
+                    truck_id=truck_id,
+                    delivery_time=now,
+                    metadata=delivered_metadata,
+                )
+                add_delivered(package.package_id)
 
-        # Record return to hub
-        self.route_history.append((HUB_INDEX, self.current_time, self.mileage))
+            # Record route history, including the return to the hub
+            add_location(stop)
+            add_seconds(start_seconds + elapsed)
+            add_miles(mileage)
+
+        self.current_time = now
+        self.mileage = mileage
+        self.current_location = location
 
         return self.mileage
 
+    def deliver_packages(self, hash_table: HashTable, log: Log) -> float:
+        """
+        Deliver all packages along a nearest neighbor route refined by 2-opt.
+
+        This method implements the core delivery algorithm:
+        1. Order the stops by repeatedly picking the nearest undelivered address
+        2. Reverse runs of stops wherever that shortens the route without
+           missing a deadline (2-opt)
+        3. Travel to each stop and deliver all packages at that location
+        4. Return to the hub
+        """
+        return self.execute(self.plan(hash_table), hash_table, log)
+
+    def route_history(self) -> Iterator[tuple[int, datetime, float]]:
+        """
+        Iterate the route as (location, time, cumulative_miles), starting with
+        the departure from the hub.
+        """
+        for location, seconds, miles in zip(
+            self._history_locations, self._history_seconds, self._history_miles
+        ):
+            yield location, self.departure_time + timedelta(seconds=seconds), miles
+
     def get_return_time(self) -> datetime:
         """
         Get the time when the truck returns to the hub.